@@ -1,416 +1,675 @@
-import json
-import datetime as dt
-from typing import Dict, List, Tuple
-
-import streamlit as st
-import pandas as pd
-
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-# =========================
-# PAGE CONFIG
-# =========================
-st.set_page_config(page_title="Faculty Grading Dashboard", layout="wide")
-st.title("🧑‍🏫 Faculty Grading Dashboard")
-
-# =========================
-# FIREBASE INIT (robust)
-# =========================
-def init_firestore():
-    if firebase_admin._apps:
-        return firestore.client()
-
-    cfg = None
-    # Try secrets (supports firebase_key as JSON string, or [firebase] table)
-    try:
-        raw = st.secrets.get("firebase_key", None)
-        if raw is None:
-            raw = st.secrets.get("firebase", None)
-        if raw is not None:
-            cfg = json.loads(raw) if isinstance(raw, str) else dict(raw)
-    except Exception:
-        cfg = None
-
-    if cfg:
-        cred = credentials.Certificate(cfg)
-        firebase_admin.initialize_app(cred)
-        return firestore.client()
-
-    # Fallback to local file
-    import os, json as _json
-    if os.path.exists("firebase_key.json"):
-        with open("firebase_key.json", "r", encoding="utf-8") as f:
-            cfg = _json.load(f)
-        cred = credentials.Certificate(cfg)
-        firebase_admin.initialize_app(cred)
-        return firestore.client()
-
-    st.error("Firebase configuration not found (secrets or local firebase_key.json).")
-    st.stop()
-
-db = init_firestore()
-
-# =========================
-# CSV MAP (same names as your main app)
-# =========================
-FILES = {
-    "Aptitude Test": "aptitude.csv",
-    "Adaptability & Learning": "adaptability_learning.csv",
-    "Communication Skills - Objective": "communcation_skills_objective.csv",
-    "Communication Skills - Descriptive": "communcation_skills_descriptive.csv",
-}
-
-# =========================
-# HELPERS
-# =========================
-@st.cache_data(ttl=20)
-def load_section_csv(section: str) -> pd.DataFrame:
-    """Load the section CSV that contains QuestionID, Question, Type, Option1..4, Correct, and optional Max/Marks."""
-    import os
-    path = FILES.get(section, "")
-    if not path or not os.path.exists(path):
-        return pd.DataFrame()
-    df = pd.read_csv(path)
-    # normalize whitespace
-    df.columns = [c.strip() if isinstance(c, str) else c for c in df.columns]
-    return df
-
-@st.cache_data(ttl=20)
-def fetch_submissions(collection: str = "student_responses") -> pd.DataFrame:
-    docs = db.collection(collection).stream()
-    data = []
-    for d in docs:
-        x = d.to_dict()
-        x["_doc_id"] = d.id
-        data.append(x)
-    return pd.DataFrame(data) if data else pd.DataFrame()
-
-def df_mcq_index(df_csv: pd.DataFrame) -> Dict[str, dict]:
-    """
-    Build an index: QuestionID -> {
-        "type": "mcq"/"short"/..., 
-        "correct": normalized correct key (option text or letter), 
-        "marks": weight (float),
-        "options": [Option1..Option4]  (normalized)
-    }
-    """
-    out = {}
-    if df_csv.empty: 
-        return out
-
-    # detect option columns
-    opt_cols = [c for c in df_csv.columns if c.lower().startswith("option")]
-    for _, row in df_csv.iterrows():
-        qid = str(row.get("QuestionID", "")).strip()
-        if not qid:
-            continue
-        qtype = str(row.get("Type", "")).strip().lower()
-        # weight/maximum
-        marks = None
-        for cand in ["Marks", "Max", "MaxMarks", "Weight"]:
-            if cand in df_csv.columns and pd.notna(row.get(cand)):
-                try:
-                    marks = float(row[cand])
-                except Exception:
-                    pass
-                break
-        if marks is None:
-            # default: mcq 1, short 1
-            marks = 1.0 if qtype == "mcq" else 1.0
-
-        # options (normalized)
-        opts = []
-        for oc in opt_cols:
-            val = row.get(oc)
-            if pd.notna(val):
-                opts.append(str(val).strip().lower())
-        # correct can be A/B/C/D, 1/2/3/4, or exact option text
-        corr_raw = row.get("Correct", "")
-        corr_norm = str(corr_raw).strip()
-        out[qid] = {
-            "type": qtype,
-            "marks": float(marks),
-            "correct": corr_norm,
-            "options": opts,
-        }
-    return out
-
-def normalize_answer(text: str) -> str:
-    return (text or "").strip().lower()
-
-def mcq_match(student_answer: str, qmeta: dict) -> bool:
-    """Return True if student's MCQ answer matches qmeta['Correct'].
-       Supports A/B/C/D, 1..n, or exact text match against options."""
-    ans = normalize_answer(student_answer)
-    corr = str(qmeta.get("correct", "")).strip()
-
-    # letter or number mapping to option index
-    letters = {"a":0, "b":1, "c":2, "d":3, "e":4}
-    nums    = {"1":0, "2":1, "3":2, "4":3, "5":4}
-
-    opts = qmeta.get("options", [])
-    if not ans:
-        return False
-
-    # if student's answer equals exact option text
-    if ans in opts:
-        ans_idx = opts.index(ans)
-    else:
-        # if student's answer is letter/number
-        if ans in letters:
-            ans_idx = letters[ans]
-        elif ans in nums:
-            ans_idx = nums[ans]
-        else:
-            # last try: raw text vs raw correct
-            return ans == normalize_answer(corr)
-
-    # Map correct corr to index
-    corr_l = normalize_answer(corr)
-    if corr_l in letters:
-        corr_idx = letters[corr_l]
-    elif corr_l in nums:
-        corr_idx = nums[corr_l]
-    else:
-        # correct as text
-        corr_idx = opts.index(corr_l) if corr_l in opts else None
-
-    if corr_idx is None:
-        return False
-
-    return ans_idx == corr_idx
-
-def compute_auto_score(section_csv: pd.DataFrame, responses: List[dict]) -> Tuple[float, Dict[str, int]]:
-    """Compute MCQ auto-score and return score plus per-question correctness (0/1)."""
-    idx = df_mcq_index(section_csv)
-    score = 0.0
-    detail = {}
-    for r in responses or []:
-        if str(r.get("Type","")).lower() != "mcq": 
-            continue
-        qid = str(r.get("QuestionID", "")).strip()
-        if not qid or qid not in idx: 
-            continue
-        if mcq_match(r.get("Response",""), idx[qid]):
-            score += float(idx[qid]["marks"] or 1.0)
-            detail[qid] = 1
-        else:
-            detail[qid] = 0
-    return score, detail
-
-def get_short_items(responses: List[dict]) -> List[dict]:
-    return [r for r in (responses or []) if str(r.get("Type","")).lower() == "short"]
-
-def per_question_max_for_short(df_csv: pd.DataFrame) -> Dict[str, int]:
-    """QuestionID->Max (int) for short; default 1 if not provided."""
-    out = {}
-    if df_csv.empty: 
-        return out
-    for _, row in df_csv.iterrows():
-        if str(row.get("Type","")).strip().lower() != "short":
-            continue
-        qid = str(row.get("QuestionID","")).strip()
-        if not qid: continue
-        mx = None
-        for cand in ["Max","Marks","MaxMarks","Weight"]:
-            if cand in df_csv.columns and pd.notna(row.get(cand)):
-                try:
-                    mx = int(float(row[cand]))
-                except Exception:
-                    pass
-                break
-        if mx is None:
-            mx = 1
-        out[qid] = max(1, mx)
-    return out
-
-def save_marks(doc_id: str, short_marks: Dict[str,int], auto_score: float):
-    total_short = sum(int(v or 0) for v in short_marks.values())
-    total = float(auto_score) + float(total_short)
-    db.collection("student_responses").document(doc_id).set(
-        {
-            "ShortMarks": short_marks,
-            "ShortMarksTotal": float(total_short),
-            "AutoScore": float(auto_score),
-            "TotalScore": float(total),
-            "Evaluated": True,
-            "EvaluatedAt": dt.datetime.utcnow().isoformat()
-        },
-        merge=True
-    )
-    return total_short, total
-
-# =========================
-# FILTERS / CONTROLS
-# =========================
-st.sidebar.header("Filters")
-section = st.sidebar.selectbox("Section", list(FILES.keys()))
-page_size = st.sidebar.selectbox("Page size", [25, 50, 100, 200], index=1)
-search = st.sidebar.text_input("Search (roll or name)").strip().lower()
-
-df_csv = load_section_csv(section)
-df_all = fetch_submissions("student_responses")
-if df_all.empty:
-    st.info("No submissions found.")
-    st.stop()
-
-df = df_all[df_all["Section"] == section].copy()
-if df.empty:
-    st.info(f"No submissions for **{section}** yet.")
-    st.stop()
-
-# quick flags
-df["Evaluated"] = df["Evaluated"].fillna(False)
-df["Descriptive"] = df["ShortMarksTotal"].fillna(0.0)
-df["AutoScore"] = df["AutoScore"].fillna(0.0)
-df["TotalScore"] = df["TotalScore"].fillna(df["Descriptive"] + df["AutoScore"])
-
-# search
-if search:
-    df = df[df.apply(lambda r: search in str(r.get("Roll","")).lower() or
-                               search in str(r.get("Name","")).lower(), axis=1)]
-
-# counts + tabs
-total = len(df)
-graded = int(df["Evaluated"].sum())
-pending = total - graded
-c1,c2,c3 = st.columns(3)
-c1.metric("Total", total)
-c2.metric("Graded", graded)
-c3.metric("Pending", pending)
-
-tab_pending, tab_graded = st.tabs([f"⏳ Pending ({pending})", f"✅ Graded ({graded})"])
-
-def list_table(_df: pd.DataFrame):
-    _df = _df[["Roll","Name","TotalScore","AutoScore","Descriptive","_doc_id"]].sort_values(["Roll"])
-    _df = _df.rename(columns={"_doc_id":"DocID"})
-    return _df
-
-with tab_pending:
-    dfP = df[df["Evaluated"] != True].copy()
-    if dfP.empty:
-        st.info("Everything is graded — great job!")
-    else:
-        pages = max(1, (len(dfP)+page_size-1)//page_size)
-        p = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
-        sl = (p-1)*page_size; sr = sl+page_size
-        st.dataframe(list_table(dfP).iloc[sl:sr], use_container_width=True, height=360)
-
-with tab_graded:
-    dfG = df[df["Evaluated"] == True].copy()
-    if dfG.empty:
-        st.info("No graded submissions yet.")
-    else:
-        pages_g = max(1, (len(dfG)+page_size-1)//page_size)
-        pg = st.number_input("Page (graded)", min_value=1, max_value=pages_g, value=1, step=1)
-        slg = (pg-1)*page_size; srg = slg+page_size
-        st.dataframe(list_table(dfG).iloc[slg:srg], use_container_width=True, height=360)
-
-st.divider()
-
-# =========================
-# PICK A STUDENT TO GRADE
-# =========================
-left, right = st.columns([0.42, 0.58], gap="large")
-
-with left:
-    st.subheader("Select a student")
-    # order: pending first
-    df = df.sort_values(["Evaluated","Roll"], ascending=[True, True])
-    choices = df.apply(lambda r: f"{'🟡' if not r['Evaluated'] else '🟢'}  {r['Roll']} — {r['Name']}  ({r['_doc_id']})", axis=1).tolist()
-    choice = st.selectbox("Student", choices)
-    doc_id = choice.split("(")[-1].rstrip(")")
-    row = df[df["_doc_id"] == doc_id].iloc[0]
-
-    st.markdown(f"**Roll:** {row['Roll']}  |  **Name:** {row['Name']}  |  **Section:** {row['Section']}")
-    st.caption(f"AutoScore: {row['AutoScore']:.2f}  |  Descriptive: {row['Descriptive']:.2f}  |  Total: {row['TotalScore']:.2f}")
-
-# =========================
-# RIGHT: GRADING FORM
-# =========================
-with right:
-    st.subheader("Grade this submission")
-
-    responses = row.get("Responses", []) or []
-    short_items = [r for r in responses if str(r.get("Type","")).lower() == "short"]
-
-    # MCQ auto-score (from CSV "Correct")
-    auto_score, mcq_detail = compute_auto_score(df_csv, responses)
-
-    # Prepare radio bounds for short questions
-    short_max = per_question_max_for_short(df_csv)
-
-    existing_short = row.get("ShortMarks", {}) if isinstance(row.get("ShortMarks"), dict) else {}
-
-    if not short_items:
-        st.info("No 'Short' questions detected in this submission.")
-    else:
-        marks_to_save: Dict[str,int] = {}
-        for i, item in enumerate(short_items, start=1):
-            qid = str(item.get("QuestionID", f"Q{i}")).strip()
-            qtext = str(item.get("Question","")).strip()
-            ans = str(item.get("Response","")).strip()
-
-            mx = int(short_max.get(qid, 1))
-            prev = int(existing_short.get(qid, 0))
-
-            with st.expander(f"{qid} — {qtext}", expanded=True):
-                st.markdown("**Student answer:**")
-                st.write(ans if ans else "_(no answer)_")
-                # radio 0..mx
-                r = st.radio(
-                    f"Score (0..{mx})",
-                    options=list(range(0, mx+1)),
-                    index=min(prev, mx),
-                    horizontal=True,
-                    key=f"radio_{doc_id}_{qid}"
-                )
-                marks_to_save[qid] = int(r)
-
-        c1, c2, c3 = st.columns([0.3, 0.35, 0.35])
-        if c1.button("💾 Save"):
-            short_total, total = save_marks(doc_id, marks_to_save, auto_score)
-            st.success(f"Saved: Short={short_total}, Auto={auto_score:.2f}, Total={total:.2f}")
-            st.cache_data.clear()
-            st.experimental_rerun()
-
-        if c2.button("💾 Save & Next Pending"):
-            short_total, total = save_marks(doc_id, marks_to_save, auto_score)
-            st.success(f"Saved: Short={short_total}, Auto={auto_score:.2f}, Total={total:.2f}")
-            # find next pending
-            pending_ids = df[df["Evaluated"] != True]["_doc_id"].tolist()
-            st.cache_data.clear()
-            if pending_ids:
-                next_id = pending_ids[0] if pending_ids[0] != doc_id else (pending_ids[1] if len(pending_ids)>1 else pending_ids[0])
-                st.experimental_set_query_params(sel=next_id)
-            st.experimental_rerun()
-
-        if c3.button("🔄 Recalculate AutoScore only"):
-            # just update autoscore (in case CSV changed)
-            db.collection("student_responses").document(doc_id).set(
-                {"AutoScore": float(auto_score), "TotalScore": float(auto_score) + float(row.get("ShortMarksTotal") or 0)},
-                merge=True,
-            )
-            st.success(f"AutoScore updated to {auto_score:.2f}")
-            st.cache_data.clear()
-            st.experimental_rerun()
-
-st.divider()
-
-# =========================
-# SUMMARY / EXPORT
-# =========================
-st.subheader("Summary & Export")
-df = fetch_submissions("student_responses")
-df = df[df["Section"] == section].copy()
-df["Evaluated"] = df["Evaluated"].fillna(False)
-df["Descriptive"] = df["ShortMarksTotal"].fillna(0.0)
-df["AutoScore"] = df["AutoScore"].fillna(0.0)
-df["TotalScore"] = df["TotalScore"].fillna(df["Descriptive"] + df["AutoScore"])
-
-summary = df[["Roll","Name","AutoScore","Descriptive","TotalScore","Evaluated","_doc_id"]].sort_values(["Evaluated","Roll"], ascending=[True, True])
-st.dataframe(summary, use_container_width=True)
-
-csv_bytes = summary.to_csv(index=False).encode("utf-8")
-st.download_button("⬇️ Download CSV", csv_bytes, file_name=f"{section}_grading_summary.csv", mime="text/csv")
+import json
+import datetime as dt
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+# =========================
+# PAGE CONFIG
+# =========================
+st.set_page_config(page_title="Faculty Grading Dashboard", layout="wide")
+st.title("🧑‍🏫 Faculty Grading Dashboard")
+
+# =========================
+# FIREBASE INIT (robust)
+# =========================
+def init_firestore():
+    if firebase_admin._apps:
+        return firestore.client()
+
+    cfg = None
+    # Try secrets (supports firebase_key as JSON string, or [firebase] table)
+    try:
+        raw = st.secrets.get("firebase_key", None)
+        if raw is None:
+            raw = st.secrets.get("firebase", None)
+        if raw is not None:
+            cfg = json.loads(raw) if isinstance(raw, str) else dict(raw)
+    except Exception:
+        cfg = None
+
+    if cfg:
+        cred = credentials.Certificate(cfg)
+        firebase_admin.initialize_app(cred)
+        return firestore.client()
+
+    # Fallback to local file
+    import os, json as _json
+    if os.path.exists("firebase_key.json"):
+        with open("firebase_key.json", "r", encoding="utf-8") as f:
+            cfg = _json.load(f)
+        cred = credentials.Certificate(cfg)
+        firebase_admin.initialize_app(cred)
+        return firestore.client()
+
+    st.error("Firebase configuration not found (secrets or local firebase_key.json).")
+    st.stop()
+
+db = init_firestore()
+
+# =========================
+# CSV MAP (same names as your main app)
+# =========================
+FILES = {
+    "Aptitude Test": "aptitude.csv",
+    "Adaptability & Learning": "adaptability_learning.csv",
+    "Communication Skills - Objective": "communcation_skills_objective.csv",
+    "Communication Skills - Descriptive": "communcation_skills_descriptive.csv",
+}
+
+# =========================
+# HELPERS
+# =========================
+# Fixed dtypes for the question-bank CSVs: skips per-column inference and
+# keeps Type as category codes. Only the columns present in a file are used.
+CSV_SCHEMA = {
+    "QuestionID": "string",
+    "Question": "string",
+    "Type": "category",
+    "Option1": "string",
+    "Option2": "string",
+    "Option3": "string",
+    "Option4": "string",
+    "Correct": "string",
+    "Marks": "float32",
+    "Max": "float32",
+    "ScaleMin": "float32",
+    "ScaleMax": "float32",
+}
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_section_csv(section: str) -> pd.DataFrame:
+    """Load the section CSV that contains QuestionID, Question, Type, Option1..4, Correct, and optional Max/Marks."""
+    import os
+    path = FILES.get(section, "")
+    if not path or not os.path.exists(path):
+        return pd.DataFrame()
+    header = pd.read_csv(path, nrows=0)
+    dtypes = {c: t for c, t in CSV_SCHEMA.items() if c in header.columns}
+    try:
+        # multi-threaded C++ reader; question banks rarely change mid-session
+        df = pd.read_csv(path, engine="pyarrow", dtype=dtypes)
+    except (ImportError, ValueError):
+        df = pd.read_csv(path, dtype=dtypes)
+    # normalize whitespace
+    df.columns = [c.strip() if isinstance(c, str) else c for c in df.columns]
+    return df
+
+# Fields the list/summary views actually read. Responses (by far the
+# largest field per doc) is fetched lazily per student when grading.
+SUBMISSION_LIGHT_FIELDS = ["Roll", "Name", "Section", "Evaluated", "AutoScore",
+                           "ShortMarksTotal", "TotalScore"]
+
+# Narrow dtypes for the submissions frame: object columns inflate memory and
+# force Python-level comparisons in every mask/sort downstream.
+SUBMISSION_DTYPES = {
+    "Section": "category",
+    "Evaluated": "boolean",
+    "AutoScore": "float32",
+    "ShortMarksTotal": "float32",
+    "TotalScore": "float32",
+}
+
+def _shrink_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    for col, dtype in SUBMISSION_DTYPES.items():
+        if col in df.columns:
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass  # unexpected payloads stay object-typed
+    return df
+
+def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Fill the grading columns in one pass: Evaluated -> bool,
+    Descriptive/AutoScore -> float32, TotalScore derived where missing."""
+    df["Evaluated"] = df["Evaluated"].fillna(False).astype(bool)
+    ds = df["ShortMarksTotal"].fillna(0.0).to_numpy(dtype="float32")
+    au = df["AutoScore"].fillna(0.0).to_numpy(dtype="float32")
+    df["Descriptive"] = ds
+    df["AutoScore"] = au
+    df["TotalScore"] = np.where(df["TotalScore"].isna(), ds + au,
+                                df["TotalScore"]).astype("float32")
+    return df
+
+@st.cache_data(ttl=20)
+def fetch_submissions(section: str, collection: str = "student_responses") -> pd.DataFrame:
+    """Fetch light submissions for one section only (filter pushed down to Firestore)."""
+    docs = list(
+        db.collection(collection)
+        .where(filter=FieldFilter("Section", "==", section))
+        .select(SUBMISSION_LIGHT_FIELDS)
+        .stream()
+    )
+    data = []
+    for d in docs:
+        x = d.to_dict()
+        x["_doc_id"] = d.id
+        data.append(x)
+    if not data:
+        return pd.DataFrame()
+    # projections omit fields a doc doesn't have, so a section with no
+    # graded submissions yields no Evaluated/score columns at all; reindex
+    # to the fixed set so _normalize_frame fills NaN columns instead of
+    # raising KeyError
+    df = pd.DataFrame(data).reindex(columns=[*SUBMISSION_LIGHT_FIELDS, "_doc_id"])
+    return _shrink_dtypes(df)
+
+@st.cache_data(ttl=20)
+def fetch_submission_full(doc_id: str) -> dict:
+    """Fetch one complete submission (incl. Responses/ShortMarks) on demand."""
+    snap = db.collection("student_responses").document(doc_id).get()
+    x = snap.to_dict() or {}
+    x["_doc_id"] = doc_id
+    return x
+
+@st.cache_resource(show_spinner=False)
+def get_submissions_store(section: str) -> dict:
+    """Live in-memory mirror of the section's submissions.
+
+    Registers a single on_snapshot listener (once per section, shared across
+    sessions via cache_resource) that applies ADDED/MODIFIED/REMOVED changes
+    to a doc_id->dict map. Reruns then read from RAM, so steady-state cost is
+    O(changed docs) instead of re-streaming the whole collection.
+    """
+    store = {"docs": {}, "lock": threading.Lock(), "ready": threading.Event()}
+
+    def _on_snapshot(doc_snapshot, changes, read_time):
+        with store["lock"]:
+            for ch in changes:
+                if ch.type.name == "REMOVED":
+                    store["docs"].pop(ch.document.id, None)
+                else:  # ADDED / MODIFIED
+                    x = ch.document.to_dict()
+                    x["_doc_id"] = ch.document.id
+                    store["docs"][ch.document.id] = x
+        store["ready"].set()
+
+    store["watch"] = (
+        db.collection("student_responses")
+        .where(filter=FieldFilter("Section", "==", section))
+        .select(SUBMISSION_LIGHT_FIELDS)
+        .on_snapshot(_on_snapshot)
+    )
+    return store
+
+def submissions_frame(section: str) -> pd.DataFrame:
+    """Snapshot the live store as a DataFrame (waits for the first snapshot)."""
+    store = get_submissions_store(section)
+    store["ready"].wait(timeout=10)
+    with store["lock"]:
+        rows = list(store["docs"].values())
+    if not rows:
+        return pd.DataFrame()
+    # same fixed column set as fetch_submissions: the projected snapshots
+    # drop absent fields, and ungraded docs have no Evaluated/score fields
+    df = pd.DataFrame(rows).reindex(columns=[*SUBMISSION_LIGHT_FIELDS, "_doc_id"])
+    return _shrink_dtypes(df)
+
+def df_mcq_index(df_csv: pd.DataFrame) -> Dict[str, dict]:
+    """
+    Build an index: QuestionID -> {
+        "type": "mcq"/"short"/..., 
+        "correct": normalized correct key (option text or letter), 
+        "marks": weight (float),
+        "options": [Option1..Option4]  (normalized)
+    }
+    """
+    out: Dict[str, dict] = {}
+    if df_csv.empty:
+        return out
+
+    n = len(df_csv)
+    qid = df_csv["QuestionID"].astype(str).str.strip().to_numpy()
+    if "Type" in df_csv.columns:
+        qtype = df_csv["Type"].astype(str).str.strip().str.lower().to_numpy()
+    else:
+        qtype = [""] * n
+
+    # weight/maximum: first candidate column present, default 1.0
+    marks_col = next((c for c in ("Marks", "Max", "MaxMarks", "Weight")
+                      if c in df_csv.columns), None)
+    if marks_col is not None:
+        marks = pd.to_numeric(df_csv[marks_col], errors="coerce").fillna(1.0).to_numpy()
+    else:
+        marks = [1.0] * n
+
+    # options (normalized) as one bulk pass over the option columns
+    opt_cols = [c for c in df_csv.columns if c.lower().startswith("option")]
+    if opt_cols:
+        opt_mask = df_csv[opt_cols].notna().to_numpy()
+        opt_text = df_csv[opt_cols].astype(str).apply(
+            lambda s: s.str.strip().str.lower()).to_numpy()
+        options = [[t for t, m in zip(ts, ms) if m]
+                   for ts, ms in zip(opt_text, opt_mask)]
+    else:
+        options = [[] for _ in range(n)]
+
+    # correct can be A/B/C/D, 1/2/3/4, or exact option text
+    if "Correct" in df_csv.columns:
+        corr_s = df_csv["Correct"]
+        corr = corr_s.astype(str).str.strip().where(corr_s.notna(), "").to_numpy()
+    else:
+        corr = [""] * n
+
+    for i in range(n):
+        if not qid[i]:
+            continue
+        # hashed option lookup (first occurrence wins, like list.index)
+        opt_to_idx: Dict[str, int] = {}
+        for j, text in enumerate(options[i]):
+            opt_to_idx.setdefault(text, j)
+        # resolve the correct answer to an option index once, here, so that
+        # mcq_match is a plain int comparison per response
+        corr_l = corr[i].lower()
+        if corr_l in LETTER_IDX:
+            c_idx = LETTER_IDX[corr_l]
+        elif corr_l in NUM_IDX:
+            c_idx = NUM_IDX[corr_l]
+        else:
+            c_idx = opt_to_idx.get(corr_l, -1)
+        out[qid[i]] = {
+            "type": qtype[i],
+            "marks": float(marks[i]),
+            "correct": corr[i],
+            "correct_idx": c_idx,
+            "options": options[i],
+            "opt_to_idx": opt_to_idx,
+        }
+    return out
+
+# letter or number mapping to option index
+LETTER_IDX = {"a":0, "b":1, "c":2, "d":3, "e":4}
+NUM_IDX    = {"1":0, "2":1, "3":2, "4":3, "5":4}
+
+def normalize_answer(text: str) -> str:
+    return (text or "").strip().lower()
+
+def mcq_match(student_answer: str, qmeta: dict) -> bool:
+    """Return True if student's MCQ answer matches qmeta['Correct'].
+       Supports A/B/C/D, 1..n, or exact text match against options.
+       The correct side is pre-resolved to qmeta['correct_idx'] by
+       df_mcq_index, so only the student's answer needs mapping here."""
+    ans = normalize_answer(student_answer)
+    if not ans:
+        return False
+
+    # if student's answer equals exact option text (hashed lookup, no list scan)
+    opt_idx = qmeta.get("opt_to_idx", {}).get(ans)
+    if opt_idx is not None:
+        ans_idx = opt_idx
+    elif ans in LETTER_IDX:
+        ans_idx = LETTER_IDX[ans]
+    elif ans in NUM_IDX:
+        ans_idx = NUM_IDX[ans]
+    else:
+        # last try: raw text vs raw correct
+        return ans == normalize_answer(qmeta.get("correct", ""))
+
+    # correct_idx is -1 when the correct answer couldn't be resolved
+    return ans_idx == qmeta.get("correct_idx", -1)
+
+def compute_auto_score(idx: Dict[str, dict], responses: List[dict]) -> Tuple[float, Dict[str, int]]:
+    """Compute MCQ auto-score and return score plus per-question correctness (0/1)."""
+    score = 0.0
+    detail = {}
+    for r in responses or []:
+        if str(r.get("Type","")).lower() != "mcq": 
+            continue
+        qid = str(r.get("QuestionID", "")).strip()
+        if not qid or qid not in idx: 
+            continue
+        if mcq_match(r.get("Response",""), idx[qid]):
+            score += float(idx[qid]["marks"] or 1.0)
+            detail[qid] = 1
+        else:
+            detail[qid] = 0
+    return score, detail
+
+def responses_as_records(responses) -> List[dict]:
+    """Normalize a Responses payload to a list of per-question dicts.
+
+    main.py writes Responses as a columnar dict of parallel lists; older
+    submissions stored one dict per question. Accept both shapes.
+    """
+    if isinstance(responses, dict):
+        keys = list(responses.keys())
+        return [dict(zip(keys, vals))
+                for vals in zip(*(responses[k] for k in keys))]
+    return list(responses or [])
+
+def get_short_items(responses: List[dict]) -> List[dict]:
+    return [r for r in (responses or []) if str(r.get("Type","")).lower() == "short"]
+
+def per_question_max_for_short(df_csv: pd.DataFrame) -> Dict[str, int]:
+    """QuestionID->Max (int) for short; default 1 if not provided."""
+    out: Dict[str, int] = {}
+    if df_csv.empty or "Type" not in df_csv.columns:
+        return out
+    short = df_csv[df_csv["Type"].astype(str).str.strip().str.lower() == "short"]
+    if short.empty:
+        return out
+    qid = short["QuestionID"].astype(str).str.strip().to_numpy()
+    max_col = next((c for c in ("Max", "Marks", "MaxMarks", "Weight")
+                    if c in short.columns), None)
+    if max_col is not None:
+        mx = pd.to_numeric(short[max_col], errors="coerce").fillna(1).astype(int).to_numpy()
+    else:
+        mx = [1] * len(short)
+    for q, m in zip(qid, mx):
+        if q:
+            out[q] = max(1, int(m))
+    return out
+
+@st.cache_data(ttl=300, show_spinner=False)
+def build_indexes(section: str) -> Tuple[Dict[str, dict], Dict[str, int]]:
+    """Build (mcq_index, short_max) for a section once and cache by name.
+
+    The CSV is constant within a session, so rebuilding both lookup dicts on
+    every rerun / every student is wasted work — this turns it into a cache hit.
+    """
+    df_csv = load_section_csv(section)
+    return df_mcq_index(df_csv), per_question_max_for_short(df_csv)
+
+@st.cache_data(persist="disk", ttl=600, show_spinner=False)
+def summary_for_section(section: str) -> pd.DataFrame:
+    """Lightweight per-section summary, persisted to disk.
+
+    A cold Streamlit restart hydrates this from the local pickle instead of
+    paying the initial Firestore scan; saves invalidate it via the cache
+    clears in the grading buttons.
+    """
+    df = fetch_submissions(section)
+    if df.empty:
+        return df
+    df = _normalize_frame(df)
+    return df[["Roll", "Name", "AutoScore", "Descriptive", "TotalScore",
+               "Evaluated", "_doc_id"]]
+
+def invalidate_submission_caches():
+    """Clear only the submission-backed caches after a write.
+
+    A blanket st.cache_data.clear() would also evict the parsed CSVs and
+    answer-key indexes for every section, forcing needless recomputation.
+    """
+    fetch_submissions.clear()
+    fetch_submission_full.clear()
+    summary_for_section.clear()
+
+FIRESTORE_BATCH_LIMIT = 500  # max writes per WriteBatch
+
+def save_marks(doc_id: str, short_marks: Dict[str,int], auto_score: float):
+    total_short = sum(int(v or 0) for v in short_marks.values())
+    total = float(auto_score) + float(total_short)
+    batch = db.batch()
+    batch.set(
+        db.collection("student_responses").document(doc_id),
+        {
+            "ShortMarks": short_marks,
+            "ShortMarksTotal": float(total_short),
+            "AutoScore": float(auto_score),
+            "TotalScore": float(total),
+            "Evaluated": True,
+            "EvaluatedAt": dt.datetime.utcnow().isoformat()
+        },
+        merge=True
+    )
+    batch.commit()
+    return total_short, total
+
+def bulk_rescore(section: str) -> Optional[int]:
+    """Recompute AutoScore/TotalScore for every submission in a section.
+
+    Updates are accumulated into WriteBatches of up to 500 writes (the
+    Firestore cap) and the batch commits are dispatched on a thread pool,
+    so independent RPCs overlap instead of paying sum-of-latencies.
+
+    Returns the number of documents updated, or None without writing
+    anything if the section's answer-key CSV could not be loaded: a
+    missing key would score every MCQ as wrong and zero out the whole
+    section. (An empty MCQ *subset* is fine — a Likert-only section
+    legitimately rescores to 0.)
+    """
+    if load_section_csv(section).empty:
+        return None
+    mcq_idx, _ = build_indexes(section)
+    # the live store is a light projection, so pull just the fields the
+    # rescore needs in one targeted query
+    docs = list(
+        db.collection("student_responses")
+        .where(filter=FieldFilter("Section", "==", section))
+        .select(["Responses", "ShortMarksTotal"])
+        .stream()
+    )
+
+    updates = []
+    for d in docs:
+        x = d.to_dict() or {}
+        auto, _ = compute_auto_score(mcq_idx, responses_as_records(x.get("Responses")))
+        updates.append((
+            d.id,
+            {"AutoScore": float(auto),
+             "TotalScore": float(auto) + float(x.get("ShortMarksTotal") or 0)},
+        ))
+    if not updates:
+        return 0
+
+    def _commit_chunk(chunk) -> int:
+        batch = db.batch()
+        for doc_id, payload in chunk:
+            batch.set(db.collection("student_responses").document(doc_id),
+                      payload, merge=True)
+        batch.commit()
+        return len(chunk)
+
+    chunks = [updates[i:i + FIRESTORE_BATCH_LIMIT]
+              for i in range(0, len(updates), FIRESTORE_BATCH_LIMIT)]
+    updated = 0
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        futures = [ex.submit(_commit_chunk, c) for c in chunks]
+        for f in as_completed(futures):
+            updated += f.result()
+    return updated
+
+# =========================
+# FILTERS / CONTROLS
+# =========================
+st.sidebar.header("Filters")
+section = st.sidebar.selectbox("Section", list(FILES.keys()))
+page_size = st.sidebar.selectbox("Page size", [25, 50, 100, 200], index=1)
+search = st.sidebar.text_input("Search (roll or name)").strip().lower()
+
+if st.sidebar.button("🔄 Recompute all AutoScores"):
+    n_rescored = bulk_rescore(section)
+    if n_rescored is None:
+        st.sidebar.error(
+            f"Answer key '{FILES.get(section)}' could not be loaded — "
+            "no scores were changed."
+        )
+    else:
+        invalidate_submission_caches()
+        st.sidebar.success(f"Recomputed AutoScore for {n_rescored} submissions.")
+
+mcq_idx, short_max = build_indexes(section)
+df_all = submissions_frame(section)
+if df_all.empty:
+    st.info(f"No submissions for **{section}** yet.")
+    st.stop()
+
+df = df_all.copy()
+
+# quick flags
+df = _normalize_frame(df)
+
+# O(1) queue of pending students for "Save & Next", rebuilt on section change
+if st.session_state.get("pending_section") != section:
+    st.session_state["pending_section"] = section
+    st.session_state["pending_queue"] = deque(
+        df[~df["Evaluated"]].sort_values("Roll")["_doc_id"].tolist())
+
+def _drop_from_pending(done_id: str):
+    queue = st.session_state.get("pending_queue")
+    if not queue:
+        return
+    if queue[0] == done_id:
+        queue.popleft()
+    else:
+        try:
+            queue.remove(done_id)
+        except ValueError:
+            pass
+
+# search (vectorized substring match, no per-row Python callback)
+if search:
+    roll_l = df["Roll"].astype(str).str.lower()
+    name_l = df["Name"].astype(str).str.lower()
+    df = df[roll_l.str.contains(search, regex=False) |
+            name_l.str.contains(search, regex=False)]
+
+# counts + tabs
+total = len(df)
+graded = int(df["Evaluated"].sum())
+pending = total - graded
+c1,c2,c3 = st.columns(3)
+c1.metric("Total", total)
+c2.metric("Graded", graded)
+c3.metric("Pending", pending)
+
+tab_pending, tab_graded = st.tabs([f"⏳ Pending ({pending})", f"✅ Graded ({graded})"])
+
+def list_table(_df: pd.DataFrame):
+    _df = _df[["Roll","Name","TotalScore","AutoScore","Descriptive","_doc_id"]].sort_values(["Roll"])
+    _df = _df.rename(columns={"_doc_id":"DocID"})
+    return _df
+
+with tab_pending:
+    dfP = df[df["Evaluated"] != True].copy()
+    if dfP.empty:
+        st.info("Everything is graded — great job!")
+    else:
+        pages = max(1, (len(dfP)+page_size-1)//page_size)
+        p = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+        sl = (p-1)*page_size; sr = sl+page_size
+        st.dataframe(list_table(dfP).iloc[sl:sr], use_container_width=True, height=360)
+
+with tab_graded:
+    dfG = df[df["Evaluated"] == True].copy()
+    if dfG.empty:
+        st.info("No graded submissions yet.")
+    else:
+        pages_g = max(1, (len(dfG)+page_size-1)//page_size)
+        pg = st.number_input("Page (graded)", min_value=1, max_value=pages_g, value=1, step=1)
+        slg = (pg-1)*page_size; srg = slg+page_size
+        st.dataframe(list_table(dfG).iloc[slg:srg], use_container_width=True, height=360)
+
+st.divider()
+
+# =========================
+# PICK A STUDENT TO GRADE
+# =========================
+left, right = st.columns([0.42, 0.58], gap="large")
+
+with left:
+    st.subheader("Select a student")
+    # order: pending first
+    df = df.sort_values(["Evaluated","Roll"], ascending=[True, True])
+    prefix = np.where(df["Evaluated"].astype(bool), "🟢", "🟡")
+    labels = (prefix + "  " + df["Roll"].astype(str) + " — " +
+              df["Name"].astype(str) + "  (" + df["_doc_id"].astype(str) + ")")
+    label_to_id = dict(zip(labels, df["_doc_id"]))
+    choice = st.selectbox("Student", labels.tolist())
+    doc_id = label_to_id[choice]
+    row = df[df["_doc_id"] == doc_id].iloc[0]
+
+    st.markdown(f"**Roll:** {row['Roll']}  |  **Name:** {row['Name']}  |  **Section:** {row['Section']}")
+    st.caption(f"AutoScore: {row['AutoScore']:.2f}  |  Descriptive: {row['Descriptive']:.2f}  |  Total: {row['TotalScore']:.2f}")
+
+# =========================
+# RIGHT: GRADING FORM
+# =========================
+with right:
+    st.subheader("Grade this submission")
+
+    # the list view carries only light fields — pull the heavy doc now
+    full_doc = fetch_submission_full(doc_id)
+    responses = responses_as_records(full_doc.get("Responses"))
+    short_items = [r for r in responses if str(r.get("Type","")).lower() == "short"]
+
+    # MCQ auto-score (from CSV "Correct"); short_max bounds come from build_indexes
+    auto_score, mcq_detail = compute_auto_score(mcq_idx, responses)
+
+    existing_short = full_doc.get("ShortMarks", {}) if isinstance(full_doc.get("ShortMarks"), dict) else {}
+
+    if not short_items:
+        st.info("No 'Short' questions detected in this submission.")
+    else:
+        marks_to_save: Dict[str,int] = {}
+        for i, item in enumerate(short_items, start=1):
+            qid = str(item.get("QuestionID", f"Q{i}")).strip()
+            qtext = str(item.get("Question","")).strip()
+            ans = str(item.get("Response","")).strip()
+
+            mx = int(short_max.get(qid, 1))
+            prev = int(existing_short.get(qid, 0))
+
+            with st.expander(f"{qid} — {qtext}", expanded=True):
+                st.markdown("**Student answer:**")
+                st.write(ans if ans else "_(no answer)_")
+                # radio 0..mx
+                r = st.radio(
+                    f"Score (0..{mx})",
+                    options=list(range(0, mx+1)),
+                    index=min(prev, mx),
+                    horizontal=True,
+                    key=f"radio_{doc_id}_{qid}"
+                )
+                marks_to_save[qid] = int(r)
+
+        c1, c2, c3 = st.columns([0.3, 0.35, 0.35])
+        if c1.button("💾 Save"):
+            short_total, total = save_marks(doc_id, marks_to_save, auto_score)
+            st.success(f"Saved: Short={short_total}, Auto={auto_score:.2f}, Total={total:.2f}")
+            _drop_from_pending(doc_id)
+            invalidate_submission_caches()
+            st.experimental_rerun()
+
+        if c2.button("💾 Save & Next Pending"):
+            short_total, total = save_marks(doc_id, marks_to_save, auto_score)
+            st.success(f"Saved: Short={short_total}, Auto={auto_score:.2f}, Total={total:.2f}")
+            # next pending comes off the head of the session queue in O(1)
+            _drop_from_pending(doc_id)
+            invalidate_submission_caches()
+            queue = st.session_state.get("pending_queue")
+            if queue:
+                st.experimental_set_query_params(sel=queue[0])
+            st.experimental_rerun()
+
+        if c3.button("🔄 Recalculate AutoScore only"):
+            # just update autoscore (in case CSV changed)
+            db.collection("student_responses").document(doc_id).set(
+                {"AutoScore": float(auto_score), "TotalScore": float(auto_score) + float(row.get("ShortMarksTotal") or 0)},
+                merge=True,
+            )
+            st.success(f"AutoScore updated to {auto_score:.2f}")
+            invalidate_submission_caches()
+            st.experimental_rerun()
+
+st.divider()
+
+# =========================
+# SUMMARY / EXPORT
+# =========================
+st.subheader("Summary & Export")
+summary = summary_for_section(section).sort_values(["Evaluated","Roll"], ascending=[True, True])
+st.dataframe(summary, use_container_width=True)
+
+csv_bytes = summary.to_csv(index=False).encode("utf-8")
+st.download_button("⬇️ Download CSV", csv_bytes, file_name=f"{section}_grading_summary.csv", mime="text/csv")
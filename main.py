@@ -1,250 +1,430 @@
-import streamlit as st
-import pandas as pd
-import firebase_admin
-from firebase_admin import credentials, firestore
-import time
-import json
-import re
-
-import streamlit as st
-
-# ---------------- PAGE CONFIG ----------------
-st.set_page_config(page_title="SKILL - 2025", layout="wide")
-st.title("🧠 SKILL - 2025")
-
-# ---------------- FIREBASE CONNECTION ----------------
-# ---------------- FIREBASE INIT (drop-in) ----------------
-def init_firestore():
-    """Initialize Firebase from Streamlit secrets (supports [firebase_key] or [firebase]).
-    Falls back to local firebase_key.json if present."""
-    if firebase_admin._apps:
-        return firestore.client()
-
-    cfg = None
-    try:
-        raw = st.secrets.get("firebase_key", None)
-        if raw is None:
-            raw = st.secrets.get("firebase", None)
-
-        if raw is not None:
-            # st.secrets returns a Mapping (TOML table) or str (JSON) depending on how you saved it
-            cfg = json.loads(raw) if isinstance(raw, str) else dict(raw)
-    except Exception:
-        cfg = None
-
-    if cfg:
-        cred = credentials.Certificate(cfg)
-        firebase_admin.initialize_app(cred)
-        return firestore.client()
-
-    # Local fallback for development
-    import os
-    if os.path.exists("firebase_key.json"):
-        cred = credentials.Certificate("firebase_key.json")
-        firebase_admin.initialize_app(cred)
-        return firestore.client()
-
-    st.error("Firebase configuration not found in secrets or local file.")
-    st.stop()
-
-# Call it BEFORE any Firestore usage
-db = init_firestore()
-st.success(f"Connected to Firestore project: {firebase_admin.get_app().project_id}")
-
-# ---------------- CSV FILES ----------------
-files = {
-    "Aptitude Test": "aptitude.csv",
-    "Adaptability & Learning": "adaptability_learning.csv",
-    "Communication Skills - Objective": "communication_skills_objective.csv",
-    "Communication Skills - Descriptive": "communication_skills_descriptive.csv",
-}
-
-# ---- inputs ----
-name = st.text_input("Enter Your Name (letters only)", value="")
-roll  = st.text_input("Enter Roll Number (e.g., 25BBAB001)", value="")
-
-# ---- validator (must be defined before you use it) ----
-def valid_name(n: str) -> bool:
-    if not isinstance(n, str):
-        return False
-    n = n.strip()
-    if not n:
-        return False
-    # letters + single spaces between words (no digits/symbols)
-    return bool(re.fullmatch(r"[A-Za-z]+(?: [A-Za-z]+)*", n))
-
-name_ok = valid_name(name)
-
-# live feedback
-if name and not name_ok:
-    st.error("Name should contain only letters and spaces (e.g., 'Ravi Kumar').")
-
-# normalized title case, if you want to save/display neatly
-clean_name = " ".join(part.capitalize() for part in name.split()) if name_ok else name
-
-
-# ---------------- MAIN APP ----------------
-if name and roll:
-    st.success(f"Welcome, {name}! Please Choose a Test in the Dropdown Below.")
-    section = st.selectbox("Select Section", list(files.keys()))
-    
-    if section == "Communication Skills - Descriptive":
-        st.info("📝 Q1 to Q10 - Find the error and correct the sentence.")
-               
-    if section:
-        try:
-            df = pd.read_csv(files[section])
-        except FileNotFoundError:
-            st.error(f"❌ File '{files[section]}' not found. Please check the file name.")
-            st.stop()
-
-        st.subheader(f"📘 {section}")
-        st.write("Answer all the questions below and click **Submit**.")
-
-        responses = []
-
-        for idx, row in df.iterrows():
-            qid = row.get("QuestionID", f"Q{idx+1}")
-            qtext = str(row.get("Question", "")).strip()
-            qtype = str(row.get("Type", "")).strip().lower()
-
-            # ---- Instructional text only ----
-            if qtype == "info":
-                st.markdown(f"### 📝 {qtext}")
-                st.markdown("---")
-                continue
-
-            st.markdown(f"**Q{idx+1}. {qtext}**")
-
-            # ---- Likert scale ----
-            if qtype == "likert":
-                scale_min = int(row.get("ScaleMin", 1))
-                scale_max = int(row.get("ScaleMax", 5))
-                response = st.slider(
-                    "Your Response:",
-                    min_value=scale_min,
-                    max_value=scale_max,
-                    value=(scale_min + scale_max) // 2,
-                    key=f"q{idx}_{section}"
-                )
-
-            # ---- Multiple Choice ----
-            elif qtype == "mcq":
-                options = [
-                    str(row.get(f"Option{i}", "")).strip()
-                    for i in range(1, 5)
-                    if pd.notna(row.get(f"Option{i}")) and str(row.get(f"Option{i}")).strip() != ""
-                ]
-                if options:
-                    response = st.radio("Your Answer:", options, key=f"q{idx}_{section}")
-                else:
-                    st.warning(f"No options available for {qid}")
-                    response = ""
-
-            # ---- Short / Descriptive ----
-            elif qtype == "short":
-                response = st.text_area("Your Answer:", key=f"q{idx}_{section}")
-
-            # ---- Unknown / Empty ----
-            else:
-                st.info(f"⚠️ Unknown question type '{qtype}' for {qid}.")
-                response = ""
-
-            responses.append({
-                "QuestionID": qid,
-                "Question": qtext,
-                "Response": response,
-                "Type": qtype,
-            })
-            st.markdown("---")
-
-        # ---------------- SUBMIT ----------------
-        if st.button("✅ Submit"):
-            if not db:
-                st.error("❌ Database connection failed. Cannot save responses.")
-            else:
-                with st.spinner("Saving your responses..."):
-                    data = {
-                        "Name": name,
-                        "Roll": roll,
-                        "Section": section,
-                        "Timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "Responses": responses,
-                    }
-                    try:
-                        # ✅ Use document ID based on roll and section
-                        doc_ref = db.collection("student_responses").document(
-                            f"{roll}_{section.replace(' ', '_')}"
-                        )
-        
-                        # ✅ This will overwrite the same document instead of creating a duplicate
-                        doc_ref.set(data, merge=True)
-        
-                        st.success("✅ Your responses have been successfully submitted (updated if existing)!")
-                    except Exception as e:
-                        st.error(f"❌ Error saving to database: {e}")
-    st.markdown(
-        "<p style='color:#007BFF; font-weight:600;'>⌨️ Press <b>Home</b> on the keyboard to return to the top of the page.</p>",
-        unsafe_allow_html=True,
-    )
-
-else:
-    st.info("👆 Please enter your Name and Roll Number to start.")
-
-# Tighten top spacing so title & fields sit higher
-st.markdown("""
-<style>
-/* Pull the whole page content up a bit */
-div.block-container {
-    padding-top: 2.0rem;      /* default is ~6rem; lower = higher on the page */
-    padding-bottom: 1.5rem;   /* optional */
-}
-
-/* Nudge the h1 title if you want it even closer to the top */
-h1, .stTitle {
-    margin-top: -0.2rem;      /* make more negative to move further up */
-}
-</style>
-""", unsafe_allow_html=True)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+import streamlit as st
+import os
+import time
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# pandas and the Firebase SDK are the two slow imports (~350 ms together);
+# they are pulled in lazily inside the functions that need them so first
+# paint doesn't pay for work the user may never trigger
+
+# orjson parses JSON several times faster than stdlib (SIMD string scanning);
+# fall back silently if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import streamlit as st
+
+# ---------------- PAGE CONFIG ----------------
+st.set_page_config(page_title="SKILL - 2025", layout="wide")
+st.title("🧠 SKILL - 2025")
+
+# ---------------- FIREBASE CONNECTION ----------------
+# ---------------- FIREBASE INIT (drop-in) ----------------
+def _json_loads(s):
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+@st.cache_resource(show_spinner=False)
+def _load_key():
+    """Parse the service-account key once per worker (supports [firebase_key]
+    or [firebase] in Streamlit secrets, falls back to local firebase_key.json)."""
+    try:
+        raw = st.secrets.get("firebase_key", None)
+        if raw is None:
+            raw = st.secrets.get("firebase", None)
+
+        if raw is not None:
+            # st.secrets returns a Mapping (TOML table) or str (JSON) depending on how you saved it
+            return _json_loads(raw) if isinstance(raw, str) else dict(raw)
+    except Exception:
+        pass
+
+    # Local fallback for development
+    if os.path.exists("firebase_key.json"):
+        with open("firebase_key.json", "rb") as f:
+            return _json_loads(f.read())
+
+    return None
+
+@st.cache_resource(show_spinner=False)
+def _build_creds():
+    """Build the certificate credential once; shared across all sessions."""
+    from firebase_admin import credentials
+
+    key = _load_key()
+    return credentials.Certificate(key) if key else None
+
+@st.cache_resource(show_spinner=False)
+def get_db():
+    """One Firestore client per worker, reused across sessions and reruns."""
+    import firebase_admin
+    from firebase_admin import firestore
+
+    if not firebase_admin._apps:
+        cred = _build_creds()
+        if cred is None:
+            st.error("Firebase configuration not found in secrets or local file.")
+            st.stop()
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
+
+# ---------------- CSV FILES ----------------
+files = {
+    "Aptitude Test": "aptitude.csv",
+    "Adaptability & Learning": "adaptability_learning.csv",
+    "Communication Skills - Objective": "communication_skills_objective.csv",
+    "Communication Skills - Descriptive": "communication_skills_descriptive.csv",
+}
+
+# ---------------- SAVE HELPERS ----------------
+ANSWER_CHUNK = 40  # answers per batch commit
+
+def _commit_answer_chunk(doc_ref, chunk, attempts: int = 3):
+    """Commit one minibatch of answer subdocs, retrying transient failures."""
+    db = get_db()
+    # one subcollection reference for the whole chunk — each .collection()
+    # call rebuilds and revalidates the document path inside the client
+    answers = doc_ref.collection("answers")
+    for attempt in range(attempts):
+        try:
+            batch = db.batch()
+            for r in chunk:
+                batch.set(answers.document(str(r["QuestionID"])), r)
+            batch.commit()
+            return
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.5 * (attempt + 1))
+
+# ---------------- QUESTION LOADING ----------------
+# Explicit dtypes skip pandas' per-column inference, and doubling as the
+# usecols whitelist drops columns the quiz never reads.
+_CSV_DTYPES = {
+    "QuestionID": "string",
+    "Question": "string",
+    "Type": "category",
+    "Option1": "string",
+    "Option2": "string",
+    "Option3": "string",
+    "Option4": "string",
+    "ScaleMin": "float32",
+    "ScaleMax": "float32",
+}
+
+@st.cache_data(ttl="1h", max_entries=16)
+def load_questions(path: str, mtime: float):
+    """Parse a question CSV once per (path, mtime); reruns reuse the cached result.
+
+    Returns (df, info_banners): info rows are split out here so the render
+    loop never re-skips them, and MCQ options are pre-extracted into an
+    Options list column so the loop doesn't re-stringify four cells per
+    question on every rerun.
+    """
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0)
+    usecols = [c for c in header.columns if c in _CSV_DTYPES]
+    dtypes = {c: _CSV_DTYPES[c] for c in usecols}
+    try:
+        df = pd.read_csv(path, engine="pyarrow", usecols=usecols, dtype=dtypes)
+    except (ImportError, ValueError):
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes)
+    opt_cols = [c for c in ("Option1", "Option2", "Option3", "Option4")
+                if c in df.columns]
+    if opt_cols:
+        text = df[opt_cols].astype(str).apply(lambda s: s.str.strip()).to_numpy()
+        mask = df[opt_cols].notna().to_numpy()
+        df["Options"] = [[t for t, m in zip(ts, ms) if m and t]
+                         for ts, ms in zip(text, mask)]
+    else:
+        df["Options"] = [[] for _ in range(len(df))]
+    # question headers never change between reruns — format them once here,
+    # before the info rows are dropped so the visible numbering is unchanged
+    df["_md"] = ("**Q" + (df.index + 1).astype(str) + ". "
+                 + df["Question"].fillna("").astype(str).str.strip() + "**")
+    # info rows are banners, not questions — pull them out of the hot loop
+    df["Type"] = df["Type"].astype(str).str.strip().str.lower()
+    info_banners = (df.loc[df["Type"] == "info", "Question"]
+                    .fillna("").astype(str).str.strip().tolist())
+    df = df[df["Type"] != "info"].reset_index(drop=True)
+    # Likert bounds become plain ints here (NaN-safe), with the midpoint
+    # default precomputed, so the render loop never casts floats per row
+    if "ScaleMin" in df.columns:
+        df["ScaleMin"] = df["ScaleMin"].fillna(1).astype("int16")
+        df["ScaleMax"] = df["ScaleMax"].fillna(5).astype("int16")
+    else:
+        df["ScaleMin"] = 1
+        df["ScaleMax"] = 5
+    df["ScaleMid"] = (df["ScaleMin"] + df["ScaleMax"]) // 2
+    return df, info_banners
+
+# ---- inputs ----
+name = st.text_input("Enter Your Name (letters only)", value="")
+roll  = st.text_input("Enter Roll Number (e.g., 25BBAB001)", value="")
+
+# letters + single spaces between words (no digits/symbols);
+# compiled once so reruns (and any batch validation) reuse the pattern
+_NAME_RE = re.compile(r"[A-Za-z]+(?: [A-Za-z]+)*")
+
+# roll numbers look like 25BBAB001: 2 digits, 4 letters, 3 digits
+_ROLL_RE = re.compile(r"[0-9]{2}[A-Z]{4}[0-9]{3}")
+
+def valid_roll(r: str) -> bool:
+    if not isinstance(r, str):
+        return False
+    return bool(_ROLL_RE.fullmatch(r.strip().upper()))
+
+# ---- validator (must be defined before you use it) ----
+def valid_name(n: str) -> bool:
+    if not isinstance(n, str):
+        return False
+    n = n.strip()
+    if not n or len(n) > 64:
+        return False
+    # cheap C-level charset test first; the regex only runs on plausible input
+    if not n.replace(" ", "").isalpha():
+        return False
+    return bool(_NAME_RE.fullmatch(n))
+
+name_ok = valid_name(name)
+
+# live feedback
+if name and not name_ok:
+    st.error("Name should contain only letters and spaces (e.g., 'Ravi Kumar').")
+
+roll_ok = valid_roll(roll)
+if roll and not roll_ok:
+    st.error("Roll number should look like 25BBAB001 (2 digits, 4 letters, 3 digits).")
+
+# normalized title case, if you want to save/display neatly
+clean_name = " ".join(part.capitalize() for part in name.split()) if name_ok else name
+
+# normalize the roll once per distinct input rather than on every rerun;
+# the answer keys and the Firestore doc id all reuse this session copy
+if roll_ok and st.session_state.get("_roll_raw") != roll:
+    st.session_state["_roll_raw"] = roll
+    st.session_state["roll_norm"] = roll.strip().upper()
+roll_norm = st.session_state.get("roll_norm", "") if roll_ok else ""
+
+
+# Fragment: typing in the name/roll inputs reruns only the top of the
+# script; the question list re-executes only when its own widgets change.
+@st.fragment
+def render_section():
+    section = st.selectbox("Select Section", list(files.keys()))
+    
+    if section == "Communication Skills - Descriptive":
+        st.info("📝 Q1 to Q10 - Find the error and correct the sentence.")
+               
+    if section:
+        try:
+            csv_path = files[section]
+            df, info_banners = load_questions(csv_path, os.path.getmtime(csv_path))
+        except FileNotFoundError:
+            st.error(f"❌ File '{files[section]}' not found. Please check the file name.")
+            st.stop()
+
+        st.subheader(f"📘 {section}")
+        st.write("Answer all the questions below and click **Submit**.")
+
+        # ---- Instructional banners (once, above the form) ----
+        for banner in info_banners:
+            st.markdown(f"### 📝 {banner}")
+            st.markdown("---")
+
+        # plain dicts are the cheapest thing to iterate — no Series or
+        # namedtuple construction per row
+        rows = df.to_dict(orient="records")
+
+        with st.form(f"quiz_form_{section}", clear_on_submit=False):
+            # SoA: four parallel lists instead of one dict per question —
+            # fewer allocations per rerun and a columnar Firestore payload
+            qids, qtexts, resps, qtypes = [], [], [], []
+            # indices of answers that differ from the persisted session copy;
+            # only these get re-written as answer subdocs on submit
+            changed_idx = []
+
+            for idx, row in enumerate(rows):
+                qid = row.get("QuestionID", f"Q{idx+1}")
+                qtext = str(row.get("Question", "")).strip()
+                qtype = str(row.get("Type", "")).strip().lower()
+
+                # answers survive section switches and revisits under this key
+                ans_key = f"ans::{roll_norm}::{section}::{qid}"
+                prior = st.session_state.get(ans_key)
+
+                st.markdown(row["_md"])
+
+                # ---- Likert scale ----
+                if qtype == "likert":
+                    scale_min = row["ScaleMin"]
+                    scale_max = row["ScaleMax"]
+                    default = (prior if isinstance(prior, int)
+                               and scale_min <= prior <= scale_max
+                               else row["ScaleMid"])
+                    response = st.slider(
+                        "Your Response:",
+                        min_value=scale_min,
+                        max_value=scale_max,
+                        value=default,
+                        key=f"q{idx}_{section}"
+                    )
+
+                # ---- Multiple Choice ----
+                elif qtype == "mcq":
+                    options = row.get("Options") or []
+                    if options:
+                        default = options.index(prior) if prior in options else 0
+                        response = st.radio("Your Answer:", options,
+                                            index=default, key=f"q{idx}_{section}")
+                    else:
+                        st.warning(f"No options available for {qid}")
+                        response = ""
+
+                # ---- Short / Descriptive ----
+                elif qtype == "short":
+                    response = st.text_area("Your Answer:",
+                                            value=prior if isinstance(prior, str) else "",
+                                            key=f"q{idx}_{section}")
+
+                # ---- Unknown / Empty ----
+                else:
+                    st.info(f"⚠️ Unknown question type '{qtype}' for {qid}.")
+                    response = ""
+
+                qids.append(qid)
+                qtexts.append(qtext)
+                resps.append(response)
+                qtypes.append(qtype)
+                if response != prior:
+                    changed_idx.append(len(qids) - 1)
+                st.session_state[ans_key] = response
+                st.markdown("---")
+
+            # ---------------- SUBMIT ----------------
+            submitted = st.form_submit_button("✅ Submit")
+
+        if submitted:
+            # reject bad rolls before any Firestore work
+            if not roll_ok:
+                st.error("❌ Please enter a valid roll number (e.g., 25BBAB001) before submitting.")
+            elif not (db := get_db()):
+                st.error("❌ Database connection failed. Cannot save responses.")
+            else:
+                from firebase_admin import firestore
+
+                with st.spinner("Saving your responses..."):
+                    data = {
+                        "Name": name,
+                        "Roll": roll_norm,
+                        "Section": section,
+                        # server-side Timestamp: immune to client clock skew
+                        # and range-queryable without parsing
+                        "Timestamp": firestore.SERVER_TIMESTAMP,
+                        "Responses": {
+                            "QuestionID": qids,
+                            "Question": qtexts,
+                            "Response": resps,
+                            "Type": qtypes,
+                        },
+                    }
+                    try:
+                        # ✅ Use document ID based on roll and section
+                        doc_ref = db.collection("student_responses").document(
+                            f"{roll_norm}_{section.replace(' ', '_')}"
+                        )
+
+                        # ✅ Overwrites the same document instead of creating a
+                        # duplicate; answer subdocs go out as minibatch commits
+                        # on a thread pool so the round-trips overlap
+                        doc_ref.set(data, merge=True)
+                        # delta fan-out: only answers that changed since the
+                        # last submit become subdoc writes
+                        answer_docs = [
+                            {"QuestionID": qids[i], "Question": qtexts[i],
+                             "Response": resps[i], "Type": qtypes[i]}
+                            for i in changed_idx
+                        ]
+                        chunks = [answer_docs[i:i + ANSWER_CHUNK]
+                                  for i in range(0, len(answer_docs), ANSWER_CHUNK)]
+                        with ThreadPoolExecutor(max_workers=10) as ex:
+                            list(ex.map(lambda c: _commit_answer_chunk(doc_ref, c), chunks))
+
+                        st.success("✅ Your responses have been successfully submitted (updated if existing)!")
+                    except Exception as e:
+                        st.error(f"❌ Error saving to database: {e}")
+
+
+# ---------------- MAIN APP ----------------
+if name and roll:
+    st.success(f"Welcome, {name}! Please Choose a Test in the Dropdown Below.")
+    render_section()
+    st.markdown(
+        "<p style='color:#007BFF; font-weight:600;'>⌨️ Press <b>Home</b> on the keyboard to return to the top of the page.</p>",
+        unsafe_allow_html=True,
+    )
+
+else:
+    st.info("👆 Please enter your Name and Roll Number to start.")
+
+# Tighten top spacing so title & fields sit higher
+st.markdown("""
+<style>
+/* Pull the whole page content up a bit */
+div.block-container {
+    padding-top: 2.0rem;      /* default is ~6rem; lower = higher on the page */
+    padding-bottom: 1.5rem;   /* optional */
+}
+
+/* Nudge the h1 title if you want it even closer to the top */
+h1, .stTitle {
+    margin-top: -0.2rem;      /* make more negative to move further up */
+}
+</style>
+""", unsafe_allow_html=True)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+